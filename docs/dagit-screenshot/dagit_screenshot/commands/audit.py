@@ -2,7 +2,9 @@
 
 import os
 import sys
-from typing import Optional
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set
 
 from typing_extensions import TypedDict
 
@@ -21,6 +23,15 @@ class SpecAuditResult(TypedDict):
     error: Optional[str]
 
 
+_MAX_SCAN_WORKERS = 32
+
+# Base URL prefixes that indicate a locally running dagit, which requires a workspace file.
+_LOCAL_URL_PREFIXES = ("http://localhost", "http://127.0.0.1", "http://[::1]")
+
+# Maps a directory path to the names of the entries it contains that are known to exist.
+DirIndex = Dict[str, Set[str]]
+
+
 def audit(
     spec_db_path: str, output_root: str, workspace_root: str, *, verify_outputs: bool = False
 ) -> None:
@@ -30,11 +41,32 @@ def audit(
     print(f"output_root: {output_root}")
     print(f"workspace_root: {workspace_root}")
 
-    results = [
-        _validate_spec(spec, output_root, workspace_root, verify_outputs) for spec in spec_db
+    # Build the existence indices up front with one scandir per distinct parent directory, rather
+    # than issuing a separate stat call for every spec.
+    workspace_paths = [
+        normalize_workspace_path(spec["workspace"], workspace_root)
+        for spec in spec_db
+        if "workspace" in spec and "base_url" in spec and _is_local(spec)
     ]
+    workspace_index = _build_dir_index(workspace_paths)
+    output_paths = (
+        [
+            normalize_output_path(spec_id_to_relative_path(spec["id"]), output_root)
+            for spec in spec_db
+        ]
+        if verify_outputs
+        else []
+    )
+    output_index = _build_dir_index(output_paths)
+
+    error_results: List[SpecAuditResult] = []
+    for spec in spec_db:
+        result = _validate_spec(
+            spec, output_root, workspace_root, verify_outputs, workspace_index, output_index
+        )
+        if not result["success"]:
+            error_results.append(result)
 
-    error_results = [r for r in results if not r["success"]]
     if len(error_results) == 0:
         print("No errors.")
     else:
@@ -44,26 +76,66 @@ def audit(
         sys.exit(1)
 
 
+def _build_dir_index(paths: Iterable[str]) -> DirIndex:
+    # Only directories referenced more than once are scanned; a lone path is cheaper to check with
+    # a single stat than by listing its whole directory. Directories are scanned concurrently so
+    # that per-directory latency overlaps on slow (e.g. network) filesystems.
+    dir_counts = Counter(os.path.dirname(path) for path in paths)
+    dirnames = [dirname for dirname, count in dir_counts.items() if count > 1]
+    if not dirnames:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(_MAX_SCAN_WORKERS, len(dirnames))) as executor:
+        return dict(zip(dirnames, executor.map(_scan_dir, dirnames)))
+
+
+def _scan_dir(dirname: str) -> Set[str]:
+    try:
+        with os.scandir(dirname or ".") as it:
+            # Symlinks are left out so that a broken link is resolved by `os.path.exists` instead.
+            return {entry.name for entry in it if not entry.is_symlink()}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
+
+
+def _path_exists(path: str, index: DirIndex) -> bool:
+    # The index only short-circuits hits. A miss falls back to `os.path.exists`, so the result
+    # matches it regardless of whether the directory was scanned (e.g. on case-insensitive
+    # filesystems, where the spelling in the spec need not match the directory listing).
+    dirname, basename = os.path.split(path)
+    if basename in index.get(dirname, ()):
+        return True
+    return os.path.exists(path)
+
+
+def _is_local(spec: ScreenshotSpec) -> bool:
+    return spec["base_url"].startswith(_LOCAL_URL_PREFIXES)
+
+
 def _validate_spec(
-    spec: ScreenshotSpec, output_root: str, workspace_root: str, verify_outputs: bool
+    spec: ScreenshotSpec,
+    output_root: str,
+    workspace_root: str,
+    verify_outputs: bool,
+    workspace_index: DirIndex,
+    output_index: DirIndex,
 ) -> SpecAuditResult:
 
     error: Optional[str] = None
 
     try:
-        if spec["base_url"].startswith("http://localhost"):
+        if _is_local(spec):
             if 'workspace' not in spec:
                 raise Exception("No workspace defined. Workspace required for local dagit.")
             workspace = spec["workspace"]
             workspace_path = normalize_workspace_path(workspace, workspace_root)
-            if not os.path.exists(workspace_path):
+            if not _path_exists(workspace_path, workspace_index):
                 raise Exception(f"No workspace-defining file exists at {workspace_path}.")
 
         if verify_outputs:
             output_path = normalize_output_path(
                 spec_id_to_relative_path(spec["id"]), output_root
             )
-            if not os.path.exists(output_path):
+            if not _path_exists(output_path, output_index):
                 raise Exception(f"No screenshot image file exists at {output_path}.")
 
     except Exception as e:
@@ -1,5 +1,6 @@
 import os
 import re
+from functools import lru_cache
 from glob import glob
 from typing import List, Sequence, cast
 
@@ -31,15 +32,21 @@ class ScreenshotSpec(TypedDict):
 
 SpecDB: TypeAlias = Sequence[ScreenshotSpec]
 
+# Use the libyaml-backed loader when available; it parses large spec DBs much faster.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
+
+@lru_cache(maxsize=None)
 def spec_id_to_relative_path(spec_id: str):
     return spec_id if re.search(r"\.\S+$", spec_id) else f"{spec_id}.png"
 
 
+@lru_cache(maxsize=None)
 def normalize_output_path(path: str, output_root: str):
     return _normalize_path(path, output_root)
 
 
+@lru_cache(maxsize=None)
 def normalize_workspace_path(path: str, workspace_root: str):
     return _normalize_path(path, workspace_root)
 
@@ -95,7 +102,7 @@ def _is_single_file_spec_db(spec_db_path: str) -> bool:
 
 def _load_yaml(path: str):
     with open(path, "r", encoding="utf8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_YamlLoader)
 
 def _load_spec_from_yaml(spec_id: str, yaml_path: str) -> RawScreenshotSpec:
     specs = _load_yaml(yaml_path)
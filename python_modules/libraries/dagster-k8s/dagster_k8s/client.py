@@ -1,11 +1,28 @@
+import json
 import logging
+import queue
+import socket
 import sys
+import threading
 import time
+from contextlib import contextmanager
 from enum import Enum
-from typing import Callable, Optional, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 import kubernetes.client
 import kubernetes.client.rest
+import urllib3
 from dagster import (
     DagsterInstance,
     _check as check,
@@ -18,6 +35,12 @@
 DEFAULT_WAIT_TIMEOUT = 86400.0  # 1 day
 DEFAULT_WAIT_BETWEEN_ATTEMPTS = 10.0  # 10 seconds
 DEFAULT_JOB_POD_COUNT = 1  # expect job:pod to be 1:1 by default
+WATCH_TIMEOUT_SECONDS = 60  # longest a single watch request is kept open before it is reopened
+WATCH_REQUEST_TIMEOUT_MARGIN = 5.0  # extra seconds the socket may wait past a watch's own timeout
+WATCH_MAX_RETRIES = 3  # most consecutive transient failures tolerated before a watch gives up
+WATCH_RETRY_INTERVAL = 1.0  # seconds to wait before reopening a watch after a transient failure
+LOG_STREAM_CHUNK_SIZE = 64 * 1024  # max bytes read off the socket at a time from a stream
+LOG_STREAM_CONNECT_TIMEOUT = 5.0  # seconds to wait for the log stream connection to be established
 
 
 class WaitForPodState(Enum):
@@ -25,6 +48,11 @@ class WaitForPodState(Enum):
     Terminated = "TERMINATED"
 
 
+class JobLifecyclePhase(Enum):
+    PodReady = "POD_READY"
+    JobSucceeded = "JOB_SUCCEEDED"
+
+
 class DagsterK8sError(Exception):
     pass
 
@@ -125,6 +153,94 @@ def k8s_api_retry(
     check.failed("Unreachable.")
 
 
+def _iter_response_lines(response: Any) -> Iterator[List[str]]:
+    """Read a streamed response made with ``_preload_content=False`` in large chunks, yielding the
+    complete lines received in each chunk as a batch, and then any trailing partial line.
+    """
+    # Split on raw bytes so that multi-byte characters spanning chunks are decoded intact
+    buffer = bytearray()
+    for chunk in response.stream(amt=LOG_STREAM_CHUNK_SIZE, decode_content=True):
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end == -1:
+            continue
+        yield buffer[:end].decode("utf-8", errors="replace").split("\n")
+        del buffer[: end + 1]
+    if buffer:
+        yield [buffer.decode("utf-8", errors="replace")]
+
+
+def _abort_response(response: Any) -> None:
+    # Closing a response does not interrupt a read blocked on it in another thread, but shutting
+    # down its socket does: the read then fails with a ProtocolError
+    sock = getattr(getattr(response, "_connection", None), "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class StreamStopEvent:
+    """Signals the threads streaming API responses to stop.
+
+    Setting it also aborts the responses being streamed with it, so that threads blocked waiting
+    for more data from a quiet stream (e.g. the logs of a pod that is still running) stop straight
+    away rather than whenever the stream next produces data.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._is_set = False
+        self._responses: Set[Any] = set()
+
+    def is_set(self) -> bool:
+        return self._is_set
+
+    def set(self) -> None:
+        with self._lock:
+            self._is_set = True
+            responses, self._responses = self._responses, set()
+        for response in responses:
+            _abort_response(response)
+
+    @contextmanager
+    def streaming(self, response: Any) -> Iterator[None]:
+        """Abort ``response`` if the event is set while it is being streamed."""
+        with self._lock:
+            if not self._is_set:
+                self._responses.add(response)
+        if self._is_set:
+            _abort_response(response)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._responses.discard(response)
+
+
+def _iter_streamed_response_lines(
+    response: Any, stop_event: Optional[StreamStopEvent]
+) -> Iterator[List[str]]:
+    """Like ``_iter_response_lines``, but ends once ``stop_event`` is set, even while waiting for
+    more data, and closes the response afterwards.
+    """
+    try:
+        if stop_event is None:
+            yield from _iter_response_lines(response)
+        else:
+            with stop_event.streaming(response):
+                try:
+                    yield from _iter_response_lines(response)
+                except urllib3.exceptions.ProtocolError:
+                    # Aborted by the stop event
+                    if not stop_event.is_set():
+                        raise
+    finally:
+        response.close()
+        response.release_conn()
+
+
 class KubernetesWaitingReasons:
     PodInitializing = "PodInitializing"
     ContainerCreating = "ContainerCreating"
@@ -135,6 +251,54 @@ class KubernetesWaitingReasons:
     CreateContainerConfigError = "CreateContainerConfigError"
 
 
+class _ContainerStatus(NamedTuple):
+    """The fields of a container status that decide whether its pod is still being waited for, read
+    from either a V1ContainerStatus model or the raw API object.
+    """
+
+    ready: bool
+    running: bool
+    waiting: Any  # the waiting state itself, for error messages
+    waiting_reason: Optional[str]
+    waiting_message: Optional[str]
+    terminated: bool
+    exit_code: Optional[int]
+    terminated_message: Optional[str]
+
+    @staticmethod
+    def from_model(container_status: Any) -> "_ContainerStatus":
+        # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstate-v1-core
+        state = container_status.state
+        waiting = state.waiting
+        terminated = state.terminated
+        return _ContainerStatus(
+            ready=bool(container_status.ready),
+            running=state.running is not None,
+            waiting=waiting,
+            waiting_reason=waiting.reason if waiting is not None else None,
+            waiting_message=waiting.message if waiting is not None else None,
+            terminated=terminated is not None,
+            exit_code=terminated.exit_code if terminated is not None else None,
+            terminated_message=terminated.message if terminated is not None else None,
+        )
+
+    @staticmethod
+    def from_dict(container_status: Mapping[str, Any]) -> "_ContainerStatus":
+        state = container_status.get("state") or {}
+        waiting = state.get("waiting")
+        terminated = state.get("terminated")
+        return _ContainerStatus(
+            ready=bool(container_status.get("ready")),
+            running=state.get("running") is not None,
+            waiting=waiting,
+            waiting_reason=waiting.get("reason") if waiting is not None else None,
+            waiting_message=waiting.get("message") if waiting is not None else None,
+            terminated=terminated is not None,
+            exit_code=terminated.get("exitCode") if terminated is not None else None,
+            terminated_message=terminated.get("message") if terminated is not None else None,
+        )
+
+
 class DagsterKubernetesClient:
     def __init__(self, batch_api, core_api, logger, sleeper, timer):
         self.batch_api = batch_api
@@ -144,10 +308,10 @@ def __init__(self, batch_api, core_api, logger, sleeper, timer):
         self.timer = timer
 
     @staticmethod
-    def production_client(batch_api_override=None):
+    def production_client(batch_api_override=None, api_client=None):
         return DagsterKubernetesClient(
-            batch_api=batch_api_override or kubernetes.client.BatchV1Api(),
-            core_api=kubernetes.client.CoreV1Api(),
+            batch_api=batch_api_override or kubernetes.client.BatchV1Api(api_client),
+            core_api=kubernetes.client.CoreV1Api(api_client),
             logger=logging.info,
             sleeper=time.sleep,
             timer=time.time,
@@ -192,26 +356,78 @@ def wait_for_job(
 
             # Get all jobs in the namespace and find the matching job
             def _get_jobs_for_namespace():
-                jobs = self.batch_api.list_namespaced_job(
+                return self.batch_api.list_namespaced_job(
                     namespace=namespace, field_selector="metadata.name={}".format(job_name)
                 )
-                if jobs.items:
-                    check.invariant(
-                        len(jobs.items) == 1,
-                        'There should only be one k8s job with name "{}", but got multiple'
-                        ' jobs:" {}'.format(job_name, jobs.items),
-                    )
-                    return jobs.items[0]
-                else:
-                    return None
 
-            job = k8s_api_retry(
+            jobs = k8s_api_retry(
                 _get_jobs_for_namespace, max_retries=3, timeout=wait_time_between_attempts
             )
+            if jobs.items:
+                check.invariant(
+                    len(jobs.items) == 1,
+                    'There should only be one k8s job with name "{}", but got multiple'
+                    ' jobs:" {}'.format(job_name, jobs.items),
+                )
+                job = jobs.items[0]
 
             if not job:
                 self.logger('Job "{job_name}" not yet launched, waiting'.format(job_name=job_name))
-                self.sleeper(wait_time_between_attempts)
+
+                # Rather than sleeping until the next poll, watch from the listed state so that we
+                # return as soon as the job is added
+                watch_timeout = wait_time_between_attempts
+                if wait_timeout:
+                    watch_timeout = min(watch_timeout, wait_timeout - (self.timer() - start))
+                job = self._watch_for_job(
+                    job_name,
+                    namespace,
+                    jobs.metadata.resource_version if jobs.metadata else None,
+                    watch_timeout,
+                    wait_time_between_attempts,
+                )
+
+    def _watch_for_job(
+        self,
+        job_name: str,
+        namespace: str,
+        resource_version: Optional[str],
+        watch_timeout: float,
+        wait_time_between_attempts: float,
+    ) -> Optional[Mapping[str, Any]]:
+        """Watch for the job named ``job_name`` to appear for up to ``watch_timeout`` seconds,
+        returning it as a raw dict, or None if it did not appear.
+        """
+        if watch_timeout <= 0:
+            return None
+
+        kwargs = {"resource_version": resource_version} if resource_version else {}
+        try:
+            for event in self._stream_watch_request(
+                self.batch_api.list_namespaced_job,
+                namespace=namespace,
+                field_selector="metadata.name={}".format(job_name),
+                timeout_seconds=max(int(watch_timeout), 1),
+                _request_timeout=watch_timeout + WATCH_REQUEST_TIMEOUT_MARGIN,
+                **kwargs,
+            ):
+                if event["type"] in ("ADDED", "MODIFIED"):
+                    return event["object"]
+        except (
+            kubernetes.client.rest.ApiException,
+            urllib3.exceptions.ProtocolError,
+            urllib3.exceptions.ReadTimeoutError,
+        ) as e:
+            # Fall back to polling, listing again after the usual interval. The watch connection
+            # can also be dropped, or go quiet for longer than the watch's own timeout.
+            self.logger(
+                'Error while watching for job "{job_name}", retrying: {error}'.format(
+                    job_name=job_name, error=e
+                )
+            )
+            self.sleeper(wait_time_between_attempts)
+
+        return None
 
     def wait_for_job_to_have_pods(
         self,
@@ -224,7 +440,9 @@ def wait_for_job_to_have_pods(
         start = start_time or self.timer()
 
         def _get_pods():
-            return self.get_pods_in_job(job_name, namespace)
+            # Resource version "0" lets the API server answer from its watch cache rather than
+            # etcd. The result may be slightly stale, which only costs another attempt here.
+            return self.get_pods_in_job(job_name, namespace, resource_version="0")
 
         while True:
             if wait_timeout and (self.timer() - start > wait_timeout):
@@ -417,23 +635,274 @@ def delete_job(
                 return False
             raise e
 
+    def watch_job_lifecycle(
+        self,
+        job_name: str,
+        namespace: str,
+        resource_version: Optional[str] = None,
+        deadline: Optional[float] = None,
+        num_pods_to_wait_for: int = DEFAULT_JOB_POD_COUNT,
+    ) -> Iterator[Tuple[JobLifecyclePhase, Any]]:
+        """Follow a launched job through its lifecycle using watch streams rather than polling.
+
+        Yields ``(JobLifecyclePhase.PodReady, pod)`` as each pod of the job gets a ready or
+        successfully terminated container, so that its logs can be streamed, and then
+        ``(JobLifecyclePhase.JobSucceeded, job)`` once ``num_pods_to_wait_for`` pods have
+        succeeded. The pod and job are the raw API objects as dicts (with camelCase keys), since
+        deserializing every watch event into models is expensive and only a few fields are read.
+
+        The job's pods and the job itself are watched concurrently for the whole lifecycle, so a
+        failed job is reported even while still waiting for its pod to become ready.
+
+        Args:
+            job_name (str): Name of the job to follow.
+            namespace (str): Namespace in which the job is located.
+            resource_version (str, optional): Resource version from which to start watching the
+                job and its pods, typically the one returned when the job was created.
+            deadline (numeric, optional): Time, as returned by ``time.monotonic()``, after which to
+                give up and raise exception. Defaults to None, which waits indefinitely.
+            num_pods_to_wait_for (int, optional): Number of pods that must succeed for the job to
+                be considered successful. Defaults to DEFAULT_JOB_POD_COUNT.
+
+        Raises:
+            DagsterK8sError: Raised when the deadline passes or the job or pod fails.
+        """
+        check.str_param(job_name, "job_name")
+        check.str_param(namespace, "namespace")
+        check.opt_str_param(resource_version, "resource_version")
+        check.opt_numeric_param(deadline, "deadline")
+        check.int_param(num_pods_to_wait_for, "num_pods_to_wait_for")
+
+        events: "queue.Queue[Tuple[str, Any, Optional[Exception]]]" = queue.Queue()
+        # Setting the stop event also aborts the watch requests in flight, so that the watch
+        # threads and their connections are released as soon as the lifecycle ends
+        stop_event = StreamStopEvent()
+        watches = {
+            "pod": dict(
+                list_fn=self.core_api.list_namespaced_pod,
+                label_selector="job-name={}".format(job_name),
+            ),
+            "job": dict(
+                list_fn=self.batch_api.list_namespaced_job,
+                field_selector="metadata.name={}".format(job_name),
+            ),
+        }
+        for kind, watch_kwargs in watches.items():
+            threading.Thread(
+                target=self._forward_watch_events,
+                args=(kind, events, stop_event),
+                kwargs=dict(watch_kwargs, namespace=namespace, resource_version=resource_version),
+                name="dagster-k8s-watch-{kind}-{job_name}".format(kind=kind, job_name=job_name),
+                daemon=True,
+            ).start()
+
+        pod = None
+        ready_pod_names: Set[str] = set()
+        succeeded_job = None
+        try:
+            while True:
+                # The job can report success before the events for its last pods have been read, so
+                # keep reading until every pod that is waited for has been reported as ready
+                if succeeded_job is not None and len(ready_pod_names) >= num_pods_to_wait_for:
+                    yield JobLifecyclePhase.JobSucceeded, succeeded_job
+                    return
+
+                try:
+                    kind, event, error = events.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                        if deadline is not None
+                        else None
+                    )
+                except queue.Empty:
+                    raise DagsterK8sTimeoutError(
+                        "Timed out while waiting for job {job_name} to complete".format(
+                            job_name=job_name
+                        )
+                        if ready_pod_names
+                        else "Timed out while waiting for pod to become ready with pod info: %s"
+                        % str(pod)
+                    )
+
+                if error:
+                    raise error
+                if event["type"] == "DELETED":
+                    continue
+
+                if kind == "pod":
+                    pod_name = event["object"]["metadata"]["name"]
+                    if pod_name in ready_pod_names:
+                        continue
+                    pod = event["object"]
+                    if self._is_pod_ready_for_logs(pod, namespace):
+                        ready_pod_names.add(pod_name)
+                        yield JobLifecyclePhase.PodReady, pod
+                    continue
+
+                job = event["object"]
+                status = job.get("status")
+                if not status:
+                    continue
+
+                # status.succeeded represents the number of pods which reached phase Succeeded.
+                if status.get("succeeded") == num_pods_to_wait_for:
+                    succeeded_job = job
+                    continue
+
+                # status.failed represents the number of pods which reached phase Failed.
+                if status.get("failed"):
+                    raise DagsterK8sError(
+                        "Encountered failed job pods for job {job_name} with status: {status}, "
+                        "in namespace {namespace}".format(
+                            job_name=job_name, status=status, namespace=namespace
+                        )
+                    )
+        finally:
+            stop_event.set()
+
+    def _forward_watch_events(
+        self,
+        kind: str,
+        events: "queue.Queue[Tuple[str, Any, Optional[Exception]]]",
+        stop_event: StreamStopEvent,
+        **kwargs,
+    ) -> None:
+        """Put ``(kind, event, None)`` on ``events`` for each watch event until ``stop_event`` is
+        set, or ``(kind, None, error)`` if the watch fails.
+        """
+        try:
+            for event in self._stream_watch_events(stop_event=stop_event, **kwargs):
+                events.put((kind, event, None))
+        except Exception as e:
+            events.put((kind, None, e))
+
+    def _stream_watch_events(
+        self,
+        list_fn: Callable[..., Any],
+        stop_event: StreamStopEvent,
+        **kwargs,
+    ) -> Iterator[Any]:
+        """Stream watch events from ``list_fn`` until ``stop_event`` is set, reopening the watch
+        whenever the API server closes it.
+
+        Each reopened watch resumes from the latest resource version seen, including those from
+        bookmark events, so that the API server does not have to replay the current state. Bookmark
+        events themselves are not yielded. Transient API errors and dropped connections also reopen
+        the watch, up to WATCH_MAX_RETRIES times in a row.
+        """
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        kwargs["allow_watch_bookmarks"] = True
+        # Bound each watch request server-side and the underlying socket client-side, so that the
+        # stop event is checked regularly even when the stream is quiet.
+        kwargs["timeout_seconds"] = WATCH_TIMEOUT_SECONDS
+        kwargs["_request_timeout"] = WATCH_TIMEOUT_SECONDS + WATCH_REQUEST_TIMEOUT_MARGIN
+        last_resource_version = kwargs.get("resource_version")
+        consecutive_failures = 0
+        while not stop_event.is_set():
+            try:
+                for event in self._stream_watch_request(list_fn, stop_event=stop_event, **kwargs):
+                    consecutive_failures = 0
+                    if stop_event.is_set():
+                        break
+                    resource_version = (event["object"].get("metadata") or {}).get(
+                        "resourceVersion"
+                    )
+                    if resource_version:
+                        last_resource_version = resource_version
+                    if event["type"] != "BOOKMARK":
+                        yield event
+            except kubernetes.client.rest.ApiException as e:
+                if e.status == 410:
+                    # The resource version being watched from is too old. Resume from a newer one
+                    # seen since the watch was opened if there is one, and otherwise from the
+                    # current state.
+                    if last_resource_version == kwargs.get("resource_version"):
+                        last_resource_version = None
+                elif e.status in WHITELISTED_TRANSIENT_K8S_STATUS_CODES:
+                    consecutive_failures += 1
+                    if consecutive_failures > WATCH_MAX_RETRIES:
+                        raise
+                    self.sleeper(WATCH_RETRY_INTERVAL)
+                else:
+                    raise
+            except (urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError):
+                # The connection was dropped, or went quiet for longer than the watch's own timeout
+                consecutive_failures += 1
+                if consecutive_failures > WATCH_MAX_RETRIES:
+                    raise
+                self.sleeper(WATCH_RETRY_INTERVAL)
+
+            if last_resource_version:
+                kwargs["resource_version"] = last_resource_version
+            else:
+                kwargs.pop("resource_version", None)
+
+    def _stream_watch_request(
+        self,
+        list_fn: Callable[..., Any],
+        stop_event: Optional[StreamStopEvent] = None,
+        **kwargs,
+    ) -> Iterator[Any]:
+        """Make a single watch request with ``list_fn`` and yield its events, with each event's
+        object left as the raw API object dict, until the watch ends or ``stop_event`` is set.
+        Raises ApiException for an ERROR event, e.g. with status 410 when the resource version
+        being watched from is too old.
+
+        The response is read straight off the socket and each line parsed once. A
+        kubernetes.watch.Watch would also re-serialize every event's object in order to deserialize
+        it again, and build a new ApiClient for each watch.
+        """
+        response = list_fn(watch=True, _preload_content=False, **kwargs)
+        for lines in _iter_streamed_response_lines(response, stop_event):
+            for line in lines:
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "ERROR":
+                    status = event["object"]
+                    raise kubernetes.client.rest.ApiException(
+                        status=status.get("code"), reason=status.get("message")
+                    )
+                yield event
+
+    def _is_pod_ready_for_logs(self, pod: Mapping[str, Any], namespace: str) -> bool:
+        """Whether the raw pod's container has started, so that its logs can be streamed. Raises if
+        the container cannot start or exited unsuccessfully.
+        """
+        pod_name = pod.get("metadata", {}).get("name")
+
+        container_statuses = (pod.get("status") or {}).get("containerStatuses")
+        if not container_statuses:
+            self.logger('Waiting for pod "%s" container status to be set...' % pod_name)
+            return False
+
+        return self._check_container_status(
+            pod_name,
+            namespace,
+            _ContainerStatus.from_dict(container_statuses[0]),
+            WaitForPodState.Ready,
+        )
+
     ### Pod operations ###
 
-    def get_pods_in_job(self, job_name, namespace):
+    def get_pods_in_job(self, job_name, namespace, resource_version=None):
         """Get the pods launched by the job ``job_name``.
 
         Args:
             job_name (str): Name of the job to inspect.
             namespace (str): Namespace in which the job is located.
+            resource_version (str, optional): Resource version constraint for the list. Defaults to
+                None, which reads the most recent state.
 
         Returns:
             List[V1Pod]: List of all pod objects that have been launched by the job ``job_name``.
         """
         check.str_param(job_name, "job_name")
         check.str_param(namespace, "namespace")
+        check.opt_str_param(resource_version, "resource_version")
 
+        kwargs = {"resource_version": resource_version} if resource_version is not None else {}
         return self.core_api.list_namespaced_pod(
-            namespace=namespace, label_selector="job-name={}".format(job_name)
+            namespace=namespace, label_selector="job-name={}".format(job_name), **kwargs
         ).items
 
     def get_pod_names_in_job(self, job_name, namespace):
@@ -508,76 +977,77 @@ def wait_for_pod(
                 continue
 
             # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstatus-v1-core
-            container_status = pod.status.container_statuses[0]
-
-            # State checks below, see:
-            # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstate-v1-core
-            state = container_status.state
-
-            if state.running is not None:
-                if wait_for_state == WaitForPodState.Ready:
-                    # ready is boolean field of container status
-                    ready = container_status.ready
-                    if not ready:
-                        self.logger('Waiting for pod "%s" to become ready...' % pod_name)
-                        self.sleeper(wait_time_between_attempts)
-                        continue
-                    else:
-                        self.logger('Pod "%s" is ready, done waiting' % pod_name)
-                        break
-                else:
-                    check.invariant(
-                        wait_for_state == WaitForPodState.Terminated, "New invalid WaitForPodState"
-                    )
-                    self.sleeper(wait_time_between_attempts)
-                    continue
+            container_status = _ContainerStatus.from_model(pod.status.container_statuses[0])
+            if self._check_container_status(pod_name, namespace, container_status, wait_for_state):
+                break
+            self.sleeper(wait_time_between_attempts)
 
-            elif state.waiting is not None:
-                # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstatewaiting-v1-core
-                if state.waiting.reason == KubernetesWaitingReasons.PodInitializing:
-                    self.logger('Waiting for pod "%s" to initialize...' % pod_name)
-                    self.sleeper(wait_time_between_attempts)
-                    continue
-                if state.waiting.reason == KubernetesWaitingReasons.CreateContainerConfigError:
-                    self.logger(
-                        'Pod "%s" is waiting due to a CreateContainerConfigError with message "%s"'
-                        " - trying again to see if it recovers" % (pod_name, state.waiting.message)
-                    )
-                    self.sleeper(wait_time_between_attempts)
-                    continue
-                elif state.waiting.reason == KubernetesWaitingReasons.ContainerCreating:
-                    self.logger("Waiting for container creation...")
-                    self.sleeper(wait_time_between_attempts)
-                    continue
-                elif state.waiting.reason in [
-                    KubernetesWaitingReasons.ErrImagePull,
-                    KubernetesWaitingReasons.ImagePullBackOff,
-                    KubernetesWaitingReasons.CrashLoopBackOff,
-                    KubernetesWaitingReasons.RunContainerError,
-                ]:
-                    raise DagsterK8sError(
-                        'Failed: Reason="{reason}" Message="{message}"'.format(
-                            reason=state.waiting.reason, message=state.waiting.message
-                        )
-                    )
-                else:
-                    raise DagsterK8sError("Unknown issue: %s" % state.waiting)
+    def _check_container_status(
+        self,
+        pod_name: str,
+        namespace: str,
+        container_status: _ContainerStatus,
+        wait_for_state: WaitForPodState,
+    ) -> bool:
+        """Whether the pod's container has reached ``wait_for_state``, or has otherwise finished
+        successfully. Raises if the container cannot start or exited unsuccessfully.
+        """
+        if container_status.running:
+            if wait_for_state == WaitForPodState.Ready:
+                if not container_status.ready:
+                    self.logger('Waiting for pod "%s" to become ready...' % pod_name)
+                    return False
+                self.logger('Pod "%s" is ready, done waiting' % pod_name)
+                return True
+            check.invariant(
+                wait_for_state == WaitForPodState.Terminated, "New invalid WaitForPodState"
+            )
+            return False
 
-            # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstateterminated-v1-core
-            elif state.terminated is not None:
-                if not state.terminated.exit_code == 0:
-                    raw_logs = self.retrieve_pod_logs(pod_name, namespace)
-                    message = state.terminated.message
-                    raise DagsterK8sError(
-                        f'Pod did not exit successfully. Failed with message: "{message}" '
-                        f'and pod logs: "{raw_logs}"'
+        elif container_status.waiting is not None:
+            # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstatewaiting-v1-core
+            reason = container_status.waiting_reason
+            if reason == KubernetesWaitingReasons.PodInitializing:
+                self.logger('Waiting for pod "%s" to initialize...' % pod_name)
+                return False
+            if reason == KubernetesWaitingReasons.CreateContainerConfigError:
+                self.logger(
+                    'Pod "%s" is waiting due to a CreateContainerConfigError with message "%s"'
+                    " - trying again to see if it recovers"
+                    % (pod_name, container_status.waiting_message)
+                )
+                return False
+            elif reason == KubernetesWaitingReasons.ContainerCreating:
+                self.logger("Waiting for container creation...")
+                return False
+            elif reason in [
+                KubernetesWaitingReasons.ErrImagePull,
+                KubernetesWaitingReasons.ImagePullBackOff,
+                KubernetesWaitingReasons.CrashLoopBackOff,
+                KubernetesWaitingReasons.RunContainerError,
+            ]:
+                raise DagsterK8sError(
+                    'Failed: Reason="{reason}" Message="{message}"'.format(
+                        reason=reason, message=container_status.waiting_message
                     )
-                else:
-                    self.logger("Pod {pod_name} exitted successfully".format(pod_name=pod_name))
-                break
-
+                )
             else:
-                raise DagsterK8sError("Should not get here, unknown pod state")
+                raise DagsterK8sError("Unknown issue: %s" % container_status.waiting)
+
+        # https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.18/#containerstateterminated-v1-core
+        elif container_status.terminated:
+            if not container_status.exit_code == 0:
+                raw_logs = self.retrieve_pod_logs(pod_name, namespace)
+                message = container_status.terminated_message
+                raise DagsterK8sError(
+                    f'Pod did not exit successfully. Failed with message: "{message}" '
+                    f'and pod logs: "{raw_logs}"'
+                )
+            self.logger("Pod {pod_name} exitted successfully".format(pod_name=pod_name))
+            return True
+
+        else:
+            raise DagsterK8sError("Should not get here, unknown pod state")
 
     def retrieve_pod_logs(
         self, pod_name: str, namespace: str, container_name: Optional[str] = None
@@ -602,3 +1072,47 @@ def retrieve_pod_logs(
         return self.core_api.read_namespaced_pod_log(
             name=pod_name, namespace=namespace, container=container_name, _preload_content=False
         ).data.decode("utf-8")
+
+    def stream_pod_logs(
+        self,
+        pod_name: str,
+        namespace: str,
+        container_name: Optional[str] = None,
+        request_timeout: Optional[float] = None,
+        stop_event: Optional[StreamStopEvent] = None,
+    ) -> Iterator[List[str]]:
+        """Follows the logs of the pod named `pod_name`, yielding batches of lines as they are
+        written.
+
+        The response is read in large chunks straight off the socket rather than through the
+        client's response handling, which would otherwise buffer and decode it line by line. Each
+        batch holds the complete lines received in one chunk, so callers can do per-batch work
+        (deadline checks, writes) once per chunk rather than once per line.
+
+        Args:
+            pod_name (str): The name of the pod from which to stream logs.
+            namespace (str): The namespace of the pod.
+            container_name (str, optional): The container whose logs to stream.
+            request_timeout (float, optional): The longest to wait for the log stream to produce
+                data before the read times out.
+            stop_event (StreamStopEvent, optional): Ends the stream once set, even while waiting
+                for the pod to write more logs.
+
+        Returns:
+            Iterator[List[str]]: Batches of log lines, without trailing newlines.
+        """
+        check.str_param(pod_name, "pod_name")
+        check.str_param(namespace, "namespace")
+        check.opt_numeric_param(request_timeout, "request_timeout")
+
+        response = self.core_api.read_namespaced_pod_log(
+            name=pod_name,
+            namespace=namespace,
+            container=container_name,
+            follow=True,
+            _preload_content=False,
+            _request_timeout=(LOG_STREAM_CONNECT_TIMEOUT, request_timeout)
+            if request_timeout
+            else None,
+        )
+        yield from _iter_streamed_response_lines(response, stop_event)
@@ -1,17 +1,45 @@
+import json
+import logging
+import os
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
 
+import kubernetes.client
 import kubernetes.config
-import kubernetes.watch
+import kubernetes.config.kube_config
+import urllib3
+import yaml
 from dagster import Field, In, Noneable, Nothing, OpExecutionContext, Permissive, StringSource, op
 from dagster._annotations import experimental
 from dagster._utils.merger import merge_dicts
 
-from ..client import DEFAULT_JOB_POD_COUNT, DagsterKubernetesClient
+from ..client import (
+    DEFAULT_JOB_POD_COUNT,
+    DagsterKubernetesClient,
+    JobLifecyclePhase,
+    StreamStopEvent,
+)
 from ..container_context import K8sContainerContext
 from ..job import DagsterK8sJobConfig, construct_dagster_k8s_job, get_k8s_job_name
 from ..launcher import K8sRunLauncher
 
+K8S_API_REFERENCE_URL = "https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.20/"
+
+
+def _raw_k8s_config_field(described_object: str, api_reference_anchor: str) -> Field:
+    return Field(
+        Permissive(),
+        is_required=False,
+        description=(
+            f"Raw k8s config for the {described_object}"
+            f" ({K8S_API_REFERENCE_URL}#{api_reference_anchor})."
+            " Keys can either snake_case or camelCase."
+        ),
+    )
+
+
 K8S_JOB_OP_CONFIG = merge_dicts(
     DagsterK8sJobConfig.config_type_container(),
     {
@@ -55,55 +83,140 @@
             is_required=False,
             description="How long to wait for the job to succeed before raising an exception",
         ),
-        "container_config": Field(
-            Permissive(),
-            is_required=False,
-            description=(
-                "Raw k8s config for the k8s pod's main container"
-                " (https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.20/#container-v1-core)."
-                " Keys can either snake_case or camelCase."
-            ),
-        ),
-        "pod_template_spec_metadata": Field(
-            Permissive(),
-            is_required=False,
-            description=(
-                "Raw k8s config for the k8s pod's metadata"
-                " (https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.20/#objectmeta-v1-meta)."
-                " Keys can either snake_case or camelCase."
-            ),
-        ),
-        "pod_spec_config": Field(
-            Permissive(),
-            is_required=False,
-            description=(
-                "Raw k8s config for the k8s pod's pod spec"
-                " (https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.20/#podspec-v1-core)."
-                " Keys can either snake_case or camelCase."
-            ),
-        ),
-        "job_metadata": Field(
-            Permissive(),
-            is_required=False,
-            description=(
-                "Raw k8s config for the k8s job's metadata"
-                " (https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.20/#objectmeta-v1-meta)."
-                " Keys can either snake_case or camelCase."
-            ),
-        ),
-        "job_spec_config": Field(
-            Permissive(),
-            is_required=False,
-            description=(
-                "Raw k8s config for the k8s job's job spec"
-                " (https://kubernetes.io/docs/reference/generated/kubernetes-api/v1.20/#jobspec-v1-batch)."
-                " Keys can either snake_case or camelCase."
-            ),
+        "container_config": _raw_k8s_config_field("k8s pod's main container", "container-v1-core"),
+        "pod_template_spec_metadata": _raw_k8s_config_field(
+            "k8s pod's metadata", "objectmeta-v1-meta"
         ),
+        "pod_spec_config": _raw_k8s_config_field("k8s pod's pod spec", "podspec-v1-core"),
+        "job_metadata": _raw_k8s_config_field("k8s job's metadata", "objectmeta-v1-meta"),
+        "job_spec_config": _raw_k8s_config_field("k8s job's job spec", "jobspec-v1-batch"),
     },
 )
 
 
+LOG_FLUSH_MAX_LINES = 64  # most pod log lines forwarded in a single log message
+MAX_LOG_STREAM_WORKERS = 16  # most pod log streams followed at once for a parallel job
+
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def _parse_kube_config(data: bytes) -> Any:
+    if data.lstrip()[:1] == b"{":
+        return json.loads(data)
+    return yaml.load(data, Loader=_YamlLoader)
+
+
+def _load_kube_config(
+    kubeconfig_file: Optional[str], client_configuration: kubernetes.client.Configuration
+) -> None:
+    # The kubernetes client parses kubeconfig files with the pure-Python YAML loader, which is slow
+    # for large merged kubeconfigs. For a single explicit file, parse it ourselves (JSON if it looks
+    # like JSON, otherwise the libyaml loader when available) and hand the result to the same
+    # loader the client would use. Default locations and KUBECONFIG-style path lists still go
+    # through the client so that its merge semantics are preserved.
+    if not kubeconfig_file or os.pathsep in kubeconfig_file:
+        kubernetes.config.load_kube_config(
+            kubeconfig_file, client_configuration=client_configuration
+        )
+        return
+
+    path = os.path.expanduser(kubeconfig_file)
+    with open(path, "rb") as f:
+        config_dict = _parse_kube_config(f.read())
+    if config_dict is None:
+        raise kubernetes.config.ConfigException(
+            "Invalid kube-config. %s file is empty" % kubeconfig_file
+        )
+
+    def _persist_config(config):
+        with open(path, "w", encoding="utf8") as f:
+            yaml.safe_dump(config, f, default_flow_style=False)
+
+    loader = kubernetes.config.kube_config.KubeConfigLoader(
+        config_dict=kubernetes.config.kube_config.ConfigNode(path, config_dict, path),
+        config_base_path=None,
+        config_persister=_persist_config,
+    )
+    loader.load_and_set(client_configuration)
+
+
+def _kubeconfig_mtimes(kubeconfig_file: Optional[str]) -> Tuple[Optional[int], ...]:
+    paths = kubeconfig_file or kubernetes.config.kube_config.KUBE_CONFIG_DEFAULT_LOCATION
+    mtimes: List[Optional[int]] = []
+    for path in paths.split(os.pathsep):
+        try:
+            mtimes.append(os.stat(os.path.expanduser(path)).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+_api_client_lock = threading.Lock()
+# API clients by config source, along with the modification times of the kubeconfig files they
+# were loaded from
+_api_clients: Dict[
+    Tuple[bool, Optional[str]],
+    Tuple[DagsterKubernetesClient, Optional[Tuple[Optional[int], ...]]],
+] = {}
+
+
+def reset_k8s_client_cache() -> None:
+    """Discard the API clients cached by ``execute_k8s_job``, so that the next invocation loads the
+    kube config again.
+    """
+    with _api_client_lock:
+        _api_clients.clear()
+
+
+def _get_api_client(
+    load_incluster_config: bool, kubeconfig_file: Optional[str]
+) -> DagsterKubernetesClient:
+    # Loading kube config and building the API clients is expensive, so it is done once per process
+    # for each config source rather than on every op invocation. Expiring credentials are kept
+    # fresh by the refresh hooks that the config loaders install on the client's configuration
+    # (re-reading the service account token, or re-running an exec plugin once its token has
+    # expired). A kubeconfig that is rewritten, e.g. with rotated credentials, gets a new client.
+    key = (load_incluster_config, kubeconfig_file)
+    kubeconfig_mtimes = None if load_incluster_config else _kubeconfig_mtimes(kubeconfig_file)
+    with _api_client_lock:
+        cached = _api_clients.get(key)
+        if cached and cached[1] == kubeconfig_mtimes:
+            return cached[0]
+
+        api_client = _create_api_client(load_incluster_config, kubeconfig_file)
+        _api_clients[key] = (api_client, kubeconfig_mtimes)
+        return api_client
+
+
+def _create_api_client(
+    load_incluster_config: bool, kubeconfig_file: Optional[str]
+) -> DagsterKubernetesClient:
+    configuration = kubernetes.client.Configuration()
+    if load_incluster_config:
+        kubernetes.config.load_incluster_config(client_configuration=configuration)
+    else:
+        _load_kube_config(kubeconfig_file, configuration)
+
+    # Room for the job and pod watches plus every concurrent pod log stream, so that requests
+    # never queue for, or churn through, pooled connections
+    configuration.connection_pool_maxsize = max(
+        configuration.connection_pool_maxsize, MAX_LOG_STREAM_WORKERS + 4
+    )
+    configuration.retries = urllib3.Retry(
+        total=5,
+        backoff_factor=0.25,
+        status_forcelist=(429, 502, 503, 504),
+        respect_retry_after_header=True,
+        # Once retries run out, return the last response so that it surfaces as an
+        # ApiException carrying its status, rather than as a urllib3 MaxRetryError
+        raise_on_status=False,
+    )
+    # The batch and core APIs share a single ApiClient, and so a single connection pool
+    return DagsterKubernetesClient.production_client(
+        api_client=kubernetes.client.ApiClient(configuration)
+    )
+
+
 @experimental
 def execute_k8s_job(
     context: OpExecutionContext,
@@ -205,13 +318,12 @@ def execute_k8s_job(
         include_run_tags=False,
     )
 
-    container_config = container_config.copy() if container_config else {}
     if command:
-        container_config["command"] = command
+        container_config = {**(container_config or {}), "command": command}
 
-    container_name = container_config.get("name", "dagster")
+    container_name = (container_config or {}).get("name", "dagster")
 
-    op_container_context = K8sContainerContext(
+    op_container_context_config = dict(
         image_pull_policy=image_pull_policy,
         image_pull_secrets=image_pull_secrets,
         service_account_name=service_account_name,
@@ -224,16 +336,22 @@ def execute_k8s_job(
         namespace=namespace,
         resources=resources,
         scheduler_name=scheduler_name,
-        run_k8s_config={
-            "container_config": container_config,
-            "pod_template_spec_metadata": pod_template_spec_metadata,
-            "pod_spec_config": pod_spec_config,
-            "job_metadata": job_metadata,
-            "job_spec_config": job_spec_config,
-        },
     )
-
-    container_context = run_container_context.merge(op_container_context)
+    op_run_k8s_config = {
+        "container_config": container_config,
+        "pod_template_spec_metadata": pod_template_spec_metadata,
+        "pod_spec_config": pod_spec_config,
+        "job_metadata": job_metadata,
+        "job_spec_config": job_spec_config,
+    }
+
+    # Merging in a container context with nothing set would leave the run's unchanged
+    if any(op_container_context_config.values()) or any(op_run_k8s_config.values()):
+        container_context = run_container_context.merge(
+            K8sContainerContext(**op_container_context_config, run_k8s_config=op_run_k8s_config)
+        )
+    else:
+        container_context = run_container_context
 
     namespace = container_context.namespace
 
@@ -276,77 +394,146 @@ def execute_k8s_job(
         },
     )
 
-    if load_incluster_config:
-        kubernetes.config.load_incluster_config()
-    else:
-        kubernetes.config.load_kube_config(kubeconfig_file)
-
-    # changing this to be able to be passed in will allow for unit testing
-    api_client = DagsterKubernetesClient.production_client()
+    api_client = _get_api_client(load_incluster_config, kubeconfig_file)
 
     context.log.info(f"Creating Kubernetes job {job_name} in namespace {namespace}...")
 
-    start_time = time.time()
+    # Measured with the monotonic clock that watch_job_lifecycle expects, so it is unaffected by
+    # wall clock adjustments
+    deadline = time.monotonic() + timeout if timeout else None
 
-    api_client.batch_api.create_namespaced_job(namespace, job)
+    created_job = api_client.batch_api.create_namespaced_job(namespace, job)
 
     context.log.info("Waiting for Kubernetes job to finish...")
 
-    timeout = timeout or 0
-
-    api_client.wait_for_job(
-        job_name=job_name,
-        namespace=namespace,
-        wait_timeout=timeout,
-        start_time=start_time,
-    )
+    if job_spec_config and job_spec_config.get("parallelism"):
+        num_pods_to_wait_for = job_spec_config["parallelism"]
+    else:
+        num_pods_to_wait_for = DEFAULT_JOB_POD_COUNT
 
-    pods = api_client.wait_for_job_to_have_pods(
+    lifecycle = api_client.watch_job_lifecycle(
         job_name,
         namespace,
-        wait_timeout=timeout,
-        start_time=start_time,
+        resource_version=created_job.metadata.resource_version,
+        deadline=deadline,
+        num_pods_to_wait_for=num_pods_to_wait_for,
     )
 
-    pod_names = [p.metadata.name for p in pods]
+    # Logs are drained on separate threads so that the job keeps being watched while they stream.
+    # Jobs with several pods have each pod's logs streamed, with lines prefixed by the pod name.
+    log_forwarder = _PodLogForwarder(context)
+    log_executor = ThreadPoolExecutor(
+        max_workers=min(num_pods_to_wait_for, MAX_LOG_STREAM_WORKERS),
+        thread_name_prefix=f"dagster-k8s-logs-{job_name}",
+    )
+    log_futures = []
+    try:
+        for phase, obj in lifecycle:
+            if phase == JobLifecyclePhase.PodReady:
+                pod_name = obj["metadata"]["name"]
+                log_futures.append(
+                    log_executor.submit(
+                        _drain_pod_logs,
+                        context,
+                        api_client,
+                        pod_name,
+                        namespace,
+                        container_name,
+                        deadline,
+                        log_forwarder,
+                        log_prefix=f"{pod_name}: " if num_pods_to_wait_for > 1 else None,
+                    )
+                )
+
+        # The pods have exited by the time the job succeeds, so their log streams end once the
+        # remaining logs have been read
+        _, not_done = wait(
+            log_futures, timeout=max(deadline - time.monotonic(), 0) if deadline else None
+        )
+        if not_done:
+            context.log.warning(
+                f"Timed out while streaming logs for Kubernetes job {job_name}: the remaining"
+                f" logs of {len(not_done)} pod(s) were not forwarded"
+            )
+    finally:
+        # Once stopped, the log threads log nothing further and their log streams are aborted, so
+        # that none is left waiting on the logs of a pod that is still running
+        log_forwarder.stop()
+        log_executor.shutdown(wait=False)
+
+
+class _PodLogForwarder:
+    """Forwards pod logs to an op's log from the threads streaming them, until stopped.
+
+    Messages are logged while holding a lock, so none are logged once ``stop`` has returned (e.g.
+    after the op's step has completed). Stopping also aborts the log streams opened with
+    ``stream_stop_event``.
+    """
 
-    if not pod_names:
-        raise Exception("No pod names in job after it started")
+    def __init__(self, context: OpExecutionContext):
+        self._context = context
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.stream_stop_event = StreamStopEvent()
 
-    pod_to_watch = pod_names[0]
-    watch = kubernetes.watch.Watch()  # consider moving in to api_client
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
 
-    api_client.wait_for_pod(pod_to_watch, namespace, wait_timeout=timeout, start_time=start_time)
+    def stop(self) -> None:
+        with self._lock:
+            self._stopped = True
+        self.stream_stop_event.set()
 
-    log_stream = watch.stream(
-        api_client.core_api.read_namespaced_pod_log,
-        name=pod_to_watch,
-        namespace=namespace,
-        container=container_name,
-    )
+    def info(self, message: str) -> None:
+        with self._lock:
+            if not self._stopped:
+                self._context.log.info(message)
 
-    while True:
-        if timeout and time.time() - start_time > timeout:
-            watch.stop()
-            raise Exception("Timed out waiting for pod to finish")
+    def exception(self, message: str) -> None:
+        with self._lock:
+            if not self._stopped:
+                self._context.log.exception(message)
 
-        try:
-            log_entry = next(log_stream)
-            print(log_entry)  # pylint: disable=print-call
-        except StopIteration:
-            break
 
-    if job_spec_config and job_spec_config.get("parallelism"):
-        num_pods_to_wait_for = job_spec_config["parallelism"]
-    else:
-        num_pods_to_wait_for = DEFAULT_JOB_POD_COUNT
-    api_client.wait_for_running_job_to_succeed(
-        job_name=job_name,
-        namespace=namespace,
-        wait_timeout=timeout,
-        start_time=start_time,
-        num_pods_to_wait_for=num_pods_to_wait_for,
+def _drain_pod_logs(
+    context: OpExecutionContext,
+    api_client: DagsterKubernetesClient,
+    pod_name: str,
+    namespace: str,
+    container_name: Optional[str],
+    deadline: Optional[float],
+    log_forwarder: _PodLogForwarder,
+    log_prefix: Optional[str] = None,
+) -> None:
+    if log_forwarder.stopped or not context.log.isEnabledFor(logging.INFO):
+        return
+
+    log_stream = api_client.stream_pod_logs(
+        pod_name,
+        namespace,
+        container_name=container_name,
+        request_timeout=max(deadline - time.monotonic(), 0.1) if deadline else None,
+        stop_event=log_forwarder.stream_stop_event,
     )
+    # Each log call becomes a Dagster event, so lines are forwarded in batches. A batch is the
+    # lines received in one chunk, which is forwarded as soon as it arrives so that output from a
+    # pod that then goes quiet is not held back.
+    try:
+        for log_lines in log_stream:
+            if log_forwarder.stopped:
+                break
+            if log_prefix:
+                log_lines = [log_prefix + line for line in log_lines]
+            for start in range(0, len(log_lines), LOG_FLUSH_MAX_LINES):
+                log_forwarder.info("\n".join(log_lines[start : start + LOG_FLUSH_MAX_LINES]))
+    except urllib3.exceptions.ReadTimeoutError:
+        # The deadline passed while waiting for more logs, which the job watch reports
+        pass
+    except Exception:
+        log_forwarder.exception(f"Error while streaming logs from pod {pod_name}")
+    finally:
+        log_stream.close()
 
 
 @op(ins={"start_after": In(Nothing)}, config_schema=K8S_JOB_OP_CONFIG)
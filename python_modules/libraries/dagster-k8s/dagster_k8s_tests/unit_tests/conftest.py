@@ -1,3 +1,6 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from dagster._core.test_utils import environ, instance_for_test
 
@@ -57,3 +60,45 @@ def k8s_run_launcher_instance(kubeconfig_file):  # pylint: disable=redefined-out
             }
         ) as instance:
             yield instance
+
+
+@pytest.fixture
+def quiet_stream_server():
+    """
+    Returns a function that takes the body of a chunked response and returns a URL serving it.
+    Once the body has been written the response stays open without writing any more, like a watch
+    with no new events or the logs of a pod that is still running.
+    """
+    bodies = {}
+    release = threading.Event()
+
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            body = bodies[self.path]
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            if body:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(body), body))
+                self.wfile.flush()
+            release.wait(30)
+
+        def log_message(self, *_args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def _serve(body):
+        path = "/{}".format(len(bodies))
+        bodies[path] = body
+        return "http://127.0.0.1:{port}{path}".format(port=server.server_port, path=path)
+
+    yield _serve
+
+    release.set()
+    server.shutdown()
+    server.server_close()
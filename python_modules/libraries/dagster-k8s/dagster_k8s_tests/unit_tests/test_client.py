@@ -1,15 +1,22 @@
+import json
+import threading
 import time
 from collections import namedtuple
 from unittest import mock
 
 import kubernetes
 import pytest
+import urllib3
 from dagster_k8s.client import (
+    WATCH_MAX_RETRIES,
+    WATCH_TIMEOUT_SECONDS,
     DagsterK8sAPIRetryLimitExceeded,
     DagsterK8sError,
     DagsterK8sUnrecoverableAPIError,
     DagsterKubernetesClient,
+    JobLifecyclePhase,
     KubernetesWaitingReasons,
+    StreamStopEvent,
     WaitForPodState,
 )
 from kubernetes.client.models import (
@@ -21,6 +28,7 @@
     V1Job,
     V1JobList,
     V1JobStatus,
+    V1ListMeta,
     V1ObjectMeta,
     V1Pod,
     V1PodList,
@@ -198,10 +206,68 @@ def test_wait_for_job_not_launched():
     completed_job = V1Job(metadata=a_job_metadata, status=V1JobStatus(failed=0, succeeded=1))
     mock_client.batch_api.read_namespaced_job_status.side_effect = [completed_job]
 
-    mock_client.wait_for_job_success(job_name, namespace)
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        # The first watch times out before the job is launched
+        mock_stream.side_effect = [iter([])]
+        mock_client.wait_for_job_success(job_name, namespace)
 
     assert_logger_calls(mock_client.logger, ['Job "a_job" not yet launched, waiting'])
 
+    # waited on a watch rather than sleeping
+    assert not mock_client.sleeper.mock_calls
+    _, watch_kwargs = mock_stream.call_args
+    assert watch_kwargs["field_selector"] == "metadata.name=a_job"
+    assert watch_kwargs["timeout_seconds"] == 10
+
+
+def test_wait_for_job_launched_while_watching():
+    mock_client = create_mocked_client()
+
+    job_name = "a_job"
+    namespace = "a_namespace"
+
+    mock_client.batch_api.list_namespaced_job.side_effect = [
+        V1JobList(items=[], metadata=V1ListMeta(resource_version="1"))
+    ]
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = [
+            iter([{"type": "ADDED", "object": {"metadata": {"name": job_name}}}])
+        ]
+        mock_client.wait_for_job(job_name, namespace)
+
+    # the job was found by the watch, without listing again
+    assert len(mock_client.batch_api.list_namespaced_job.mock_calls) == 1
+    assert not mock_client.sleeper.mock_calls
+    _, watch_kwargs = mock_stream.call_args
+    assert watch_kwargs["resource_version"] == "1"
+
+
+@pytest.mark.parametrize(
+    "watch_error",
+    [
+        kubernetes.client.rest.ApiException(status=500),
+        urllib3.exceptions.ProtocolError("Connection broken"),
+        urllib3.exceptions.ReadTimeoutError(None, None, "Read timed out."),
+    ],
+)
+def test_wait_for_job_watch_error(watch_error):
+    mock_client = create_mocked_client()
+
+    job_name = "a_job"
+    namespace = "a_namespace"
+
+    mock_client.batch_api.list_namespaced_job.side_effect = [
+        V1JobList(items=[]),
+        V1JobList(items=[V1Job(metadata=V1ObjectMeta(name=job_name))]),
+    ]
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = watch_error
+        mock_client.wait_for_job(job_name, namespace)
+
+    # fell back to polling
+    assert len(mock_client.batch_api.list_namespaced_job.mock_calls) == 2
     assert len(mock_client.sleeper.mock_calls) == 1
 
 
@@ -234,7 +300,9 @@ def test_wait_for_job_with_api_errors():
     completed_job = V1Job(metadata=a_job_metadata, status=V1JobStatus(failed=0, succeeded=1))
     mock_client.batch_api.read_namespaced_job_status.side_effect = [completed_job]
 
-    mock_client.wait_for_job_success(job_name, namespace)
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = [iter([])]
+        mock_client.wait_for_job_success(job_name, namespace)
 
     # 2 attempts with errors + 1 not launched + 1 launched
     assert len(mock_client.batch_api.list_namespaced_job.mock_calls) == 4
@@ -334,6 +402,45 @@ def test_long_running_job():
 ###
 
 
+def test_wait_for_job_to_have_pods():
+    mock_client = create_mocked_client()
+
+    a_pod = V1Pod(metadata=V1ObjectMeta(name="a_pod"))
+    mock_client.core_api.list_namespaced_pod.side_effect = [
+        V1PodList(items=[]),
+        V1PodList(items=[a_pod]),
+    ]
+
+    assert mock_client.wait_for_job_to_have_pods("a_job", "a_namespace") == [a_pod]
+
+    _, kwargs = mock_client.core_api.list_namespaced_pod.call_args
+    assert kwargs["label_selector"] == "job-name=a_job"
+    assert kwargs["resource_version"] == "0"
+
+
+def test_stream_pod_logs():
+    mock_client = create_mocked_client()
+
+    # split the stream in the middle of a line and in the middle of a multi-byte character
+    log_bytes = "first line\nsecond lïne\nthird line\nlast".encode("utf-8")
+    split_at = log_bytes.index("ï".encode("utf-8")) + 1
+    mock_response = mock.MagicMock()
+    mock_response.stream.return_value = iter([log_bytes[:split_at], log_bytes[split_at:]])
+    mock_client.core_api.read_namespaced_pod_log.return_value = mock_response
+
+    assert list(mock_client.stream_pod_logs("a_pod", "a_namespace", request_timeout=30)) == [
+        ["first line"],
+        ["second lïne", "third line"],
+        ["last"],
+    ]
+
+    _, kwargs = mock_client.core_api.read_namespaced_pod_log.call_args
+    assert kwargs["follow"] is True
+    assert kwargs["_preload_content"] is False
+    assert kwargs["_request_timeout"] == (5.0, 30)
+    assert mock_response.release_conn.called
+
+
 def test_retrieve_pod_logs():
     mock_client = create_mocked_client()
 
@@ -716,3 +823,434 @@ def test_get_names_in_job():
     mock_client.core_api.list_namespaced_pod.side_effect = [pod_list]
 
     assert mock_client.get_pod_names_in_job("job", "namespace") == ["foo", "bar"]
+
+
+###
+# watch_job_lifecycle
+###
+def _raw_object(model):
+    return kubernetes.client.ApiClient().sanitize_for_serialization(model)
+
+
+def _pod_event(container_status, event_type="MODIFIED"):
+    return {
+        "type": event_type,
+        "object": _raw_object(
+            V1Pod(
+                metadata=V1ObjectMeta(name="a_pod"),
+                status=V1PodStatus(container_statuses=[container_status]),
+            )
+        ),
+    }
+
+
+def _job_event(status, event_type="MODIFIED"):
+    return {
+        "type": event_type,
+        "object": _raw_object(V1Job(metadata=V1ObjectMeta(name="a_job"), status=status)),
+    }
+
+
+def _mock_watch_streams(mock_client, pod_events, job_events):
+    """Side effect for _stream_watch_request that returns each resource's events from its first watch
+    request, and nothing from the requests that reopen it.
+    """
+    remaining_events = {
+        mock_client.core_api.list_namespaced_pod: list(pod_events),
+        mock_client.batch_api.list_namespaced_job: list(job_events),
+    }
+
+    def _stream(list_fn, **_kwargs):
+        events = remaining_events[list_fn]
+        if not events:
+            time.sleep(0.01)
+        remaining_events[list_fn] = []
+        return iter(events)
+
+    return _stream
+
+
+def _watch_kwargs(mock_stream, list_fn):
+    return next(kwargs for args, kwargs in mock_stream.call_args_list if args[0] == list_fn)
+
+
+def test_watch_job_lifecycle_success():
+    mock_client = create_mocked_client()
+
+    pod_events = [
+        _pod_event(
+            _create_status(
+                state=V1ContainerState(
+                    waiting=V1ContainerStateWaiting(
+                        reason=KubernetesWaitingReasons.ContainerCreating
+                    )
+                ),
+                ready=False,
+            ),
+            event_type="ADDED",
+        ),
+        _pod_event(_ready_running_status()),
+    ]
+    job_events = [
+        _job_event(V1JobStatus(active=1), event_type="ADDED"),
+        _job_event(V1JobStatus(succeeded=1)),
+    ]
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = _mock_watch_streams(mock_client, pod_events, job_events)
+        phases = [
+            (phase, obj["metadata"]["name"])
+            for phase, obj in mock_client.watch_job_lifecycle(
+                "a_job", "a_namespace", resource_version="1"
+            )
+        ]
+
+    assert phases == [
+        (JobLifecyclePhase.PodReady, "a_pod"),
+        (JobLifecyclePhase.JobSucceeded, "a_job"),
+    ]
+
+    pod_watch_kwargs = _watch_kwargs(mock_stream, mock_client.core_api.list_namespaced_pod)
+    assert pod_watch_kwargs["label_selector"] == "job-name=a_job"
+    assert pod_watch_kwargs["resource_version"] == "1"
+    job_watch_kwargs = _watch_kwargs(mock_stream, mock_client.batch_api.list_namespaced_job)
+    assert job_watch_kwargs["field_selector"] == "metadata.name=a_job"
+
+    # sleeper should not have been called
+    assert not mock_client.sleeper.mock_calls
+
+
+def test_watch_job_lifecycle_multiple_pods():
+    mock_client = create_mocked_client()
+
+    pod_events = [_pod_event(_ready_running_status()) for _ in range(2)]
+    pod_events[1]["object"]["metadata"]["name"] = "another_pod"
+    # a ready pod is only reported once
+    pod_events.append(_pod_event(_ready_running_status()))
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = _mock_watch_streams(
+            mock_client, pod_events, [_job_event(V1JobStatus(succeeded=2))]
+        )
+        phases = [
+            (phase, obj["metadata"]["name"])
+            for phase, obj in mock_client.watch_job_lifecycle(
+                "a_job", "a_namespace", num_pods_to_wait_for=2
+            )
+        ]
+
+    assert sorted(phases[:2]) == [
+        (JobLifecyclePhase.PodReady, "a_pod"),
+        (JobLifecyclePhase.PodReady, "another_pod"),
+    ]
+    assert phases[2:] == [(JobLifecyclePhase.JobSucceeded, "a_job")]
+
+
+def test_watch_job_lifecycle_job_succeeded_before_last_pod_ready():
+    mock_client = create_mocked_client()
+
+    def _pod_events():
+        yield _pod_event(_ready_running_status())
+        # The job's success is read before the second pod's event arrives
+        time.sleep(0.2)
+        another_pod_event = _pod_event(_ready_running_status())
+        another_pod_event["object"]["metadata"]["name"] = "another_pod"
+        yield another_pod_event
+
+    def _stream(list_fn, **_kwargs):
+        if list_fn == mock_client.core_api.list_namespaced_pod:
+            return _pod_events()
+        return iter([_job_event(V1JobStatus(succeeded=2))])
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = _stream
+        phases = [
+            (phase, obj["metadata"]["name"])
+            for phase, obj in mock_client.watch_job_lifecycle(
+                "a_job", "a_namespace", num_pods_to_wait_for=2
+            )
+        ]
+
+    assert phases == [
+        (JobLifecyclePhase.PodReady, "a_pod"),
+        (JobLifecyclePhase.PodReady, "another_pod"),
+        (JobLifecyclePhase.JobSucceeded, "a_job"),
+    ]
+
+
+def test_watch_job_lifecycle_job_failed():
+    mock_client = create_mocked_client()
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = _mock_watch_streams(
+            mock_client,
+            [_pod_event(_ready_running_status())],
+            [_job_event(V1JobStatus(failed=1))],
+        )
+        with pytest.raises(DagsterK8sError, match="Encountered failed job pods for job a_job"):
+            list(mock_client.watch_job_lifecycle("a_job", "a_namespace"))
+
+
+def test_watch_job_lifecycle_job_failed_before_pod_ready():
+    mock_client = create_mocked_client()
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        # The pod never reports a container status, but the job fails
+        mock_stream.side_effect = _mock_watch_streams(
+            mock_client, [], [_job_event(V1JobStatus(failed=1))]
+        )
+        with pytest.raises(DagsterK8sError, match="Encountered failed job pods for job a_job"):
+            list(mock_client.watch_job_lifecycle("a_job", "a_namespace"))
+
+
+def test_watch_job_lifecycle_bad_waiting_state():
+    mock_client = create_mocked_client()
+
+    bad_waiting_status = _create_status(
+        state=V1ContainerState(
+            waiting=V1ContainerStateWaiting(
+                reason=KubernetesWaitingReasons.ErrImagePull, message="bad_image"
+            )
+        ),
+        ready=False,
+    )
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = _mock_watch_streams(
+            mock_client, [_pod_event(bad_waiting_status)], []
+        )
+        with pytest.raises(DagsterK8sError, match='Reason="ErrImagePull" Message="bad_image"'):
+            list(mock_client.watch_job_lifecycle("a_job", "a_namespace"))
+
+
+def test_watch_job_lifecycle_watch_error():
+    mock_client = create_mocked_client()
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = kubernetes.client.rest.ApiException(status=403)
+        with pytest.raises(kubernetes.client.rest.ApiException):
+            list(mock_client.watch_job_lifecycle("a_job", "a_namespace"))
+
+
+def test_watch_job_lifecycle_timeout():
+    mock_client = create_mocked_client()
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        # The watches close without the pod becoming ready
+        mock_stream.side_effect = _mock_watch_streams(mock_client, [], [])
+        with pytest.raises(
+            DagsterK8sError, match="Timed out while waiting for pod to become ready"
+        ):
+            list(
+                mock_client.watch_job_lifecycle(
+                    "a_job", "a_namespace", deadline=time.monotonic() + 0.1
+                )
+            )
+
+    pod_watch_kwargs = _watch_kwargs(mock_stream, mock_client.core_api.list_namespaced_pod)
+    assert pod_watch_kwargs["timeout_seconds"] == WATCH_TIMEOUT_SECONDS
+
+
+def test_stream_watch_events_resumes_from_latest_resource_version():
+    mock_client = create_mocked_client()
+    stop_event = StreamStopEvent()
+
+    def _event(event_type, resource_version):
+        return {
+            "type": event_type,
+            "object": {"metadata": {"name": "a_pod", "resourceVersion": resource_version}},
+        }
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = [
+            iter([_event("BOOKMARK", "5"), _event("MODIFIED", "6")]),
+            # the watch from resource version 6 has expired
+            kubernetes.client.rest.ApiException(status=410),
+            iter([_event("ADDED", "7"), _event("MODIFIED", "8")]),
+        ]
+        events = mock_client._stream_watch_events(  # pylint: disable=protected-access
+            mock_client.core_api.list_namespaced_pod,
+            stop_event,
+            namespace="a_namespace",
+            resource_version="1",
+        )
+        assert next(events)["object"]["metadata"]["resourceVersion"] == "6"
+        assert next(events)["object"]["metadata"]["resourceVersion"] == "7"
+        stop_event.set()
+        assert list(events) == []
+
+    assert [kwargs.get("resource_version") for _, kwargs in mock_stream.call_args_list] == [
+        "1",
+        "6",
+        None,
+    ]
+    assert all(kwargs["allow_watch_bookmarks"] for _, kwargs in mock_stream.call_args_list)
+
+
+def test_stream_watch_events_retries_transient_errors():
+    mock_client = create_mocked_client()
+    stop_event = StreamStopEvent()
+
+    def _event(resource_version):
+        return {
+            "type": "MODIFIED",
+            "object": {"metadata": {"name": "a_pod", "resourceVersion": resource_version}},
+        }
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = [
+            iter([_event("2")]),
+            kubernetes.client.rest.ApiException(status=503),
+            urllib3.exceptions.ProtocolError("Connection broken"),
+            iter([_event("3")]),
+        ]
+        events = mock_client._stream_watch_events(  # pylint: disable=protected-access
+            mock_client.core_api.list_namespaced_pod,
+            stop_event,
+            namespace="a_namespace",
+            resource_version="1",
+        )
+        assert next(events)["object"]["metadata"]["resourceVersion"] == "2"
+        assert next(events)["object"]["metadata"]["resourceVersion"] == "3"
+        stop_event.set()
+        assert list(events) == []
+
+    # every reconnect resumes from the latest resource version seen
+    assert [kwargs.get("resource_version") for _, kwargs in mock_stream.call_args_list] == [
+        "1",
+        "2",
+        "2",
+        "2",
+    ]
+    assert len(mock_client.sleeper.mock_calls) == 2
+
+
+def test_stream_watch_events_retry_limit():
+    mock_client = create_mocked_client()
+
+    with mock.patch.object(DagsterKubernetesClient, "_stream_watch_request") as mock_stream:
+        mock_stream.side_effect = kubernetes.client.rest.ApiException(status=503)
+        with pytest.raises(kubernetes.client.rest.ApiException):
+            list(
+                mock_client._stream_watch_events(  # pylint: disable=protected-access
+                    mock_client.core_api.list_namespaced_pod,
+                    StreamStopEvent(),
+                    namespace="a_namespace",
+                )
+            )
+
+    assert mock_stream.call_count == WATCH_MAX_RETRIES + 1
+
+
+def _watch_response(chunks):
+    response = mock.MagicMock()
+    response.stream.return_value = iter(chunks)
+    return response
+
+
+def test_stream_watch_request():
+    mock_client = create_mocked_client()
+
+    events = [
+        {"type": "ADDED", "object": {"metadata": {"name": "a_pod", "resourceVersion": "2"}}},
+        {"type": "MODIFIED", "object": {"metadata": {"name": "a_pod", "resourceVersion": "3"}}},
+    ]
+    data = "".join(json.dumps(event) + "\n" for event in events).encode("utf-8")
+    # an event can be split across chunks
+    response = _watch_response([data[:10], data[10:]])
+    mock_client.core_api.list_namespaced_pod.return_value = response
+
+    streamed_events = list(
+        mock_client._stream_watch_request(  # pylint: disable=protected-access
+            mock_client.core_api.list_namespaced_pod, namespace="a_namespace"
+        )
+    )
+
+    assert streamed_events == events
+    mock_client.core_api.list_namespaced_pod.assert_called_once_with(
+        watch=True, _preload_content=False, namespace="a_namespace"
+    )
+    assert response.close.called
+    assert response.release_conn.called
+
+
+def test_stream_watch_request_error_event():
+    mock_client = create_mocked_client()
+
+    error_event = {
+        "type": "ERROR",
+        "object": {"kind": "Status", "code": 410, "message": "too old resource version: 1 (2)"},
+    }
+    response = _watch_response([(json.dumps(error_event) + "\n").encode("utf-8")])
+    mock_client.core_api.list_namespaced_pod.return_value = response
+
+    with pytest.raises(kubernetes.client.rest.ApiException) as exc_info:
+        list(
+            mock_client._stream_watch_request(  # pylint: disable=protected-access
+                mock_client.core_api.list_namespaced_pod, namespace="a_namespace"
+            )
+        )
+
+    assert exc_info.value.status == 410
+    assert response.close.called
+
+
+def test_stream_watch_request_stop_event_aborts_quiet_watch(quiet_stream_server):
+    mock_client = create_mocked_client()
+    stop_event = StreamStopEvent()
+    pool = urllib3.PoolManager()
+
+    event = {"type": "ADDED", "object": {"metadata": {"name": "a_pod", "resourceVersion": "2"}}}
+    url = quiet_stream_server((json.dumps(event) + "\n").encode("utf-8"))
+    mock_client.core_api.list_namespaced_pod.side_effect = lambda **_kwargs: pool.request(
+        "GET", url, preload_content=False
+    )
+
+    received = []
+    received_event = threading.Event()
+
+    def _consume():
+        for watch_event in mock_client._stream_watch_request(  # pylint: disable=protected-access
+            mock_client.core_api.list_namespaced_pod, stop_event=stop_event
+        ):
+            received.append(watch_event)
+            received_event.set()
+
+    consumer = threading.Thread(target=_consume, daemon=True)
+    consumer.start()
+    assert received_event.wait(5)
+
+    # the watch writes nothing more, but stopping ends it straight away
+    stop_event.set()
+    consumer.join(5)
+    assert not consumer.is_alive()
+    assert received == [event]
+
+
+def test_watch_job_lifecycle_releases_watches(quiet_stream_server):
+    mock_client = create_mocked_client()
+    pool = urllib3.PoolManager()
+
+    def _watch_url(event):
+        return quiet_stream_server((json.dumps(event) + "\n").encode("utf-8"))
+
+    urls = {
+        mock_client.core_api.list_namespaced_pod: _watch_url(_pod_event(_ready_running_status())),
+        mock_client.batch_api.list_namespaced_job: _watch_url(_job_event(V1JobStatus(succeeded=1))),
+    }
+    for list_fn, url in urls.items():
+        list_fn.side_effect = lambda _url=url, **_kwargs: pool.request(
+            "GET", _url, preload_content=False
+        )
+
+    phases = [phase for phase, _ in mock_client.watch_job_lifecycle("quiet_job", "a_namespace")]
+    assert phases == [JobLifecyclePhase.PodReady, JobLifecyclePhase.JobSucceeded]
+
+    # the watches write nothing more, but the threads following them end with the lifecycle
+    # rather than when the watch requests time out
+    watch_threads = [
+        thread for thread in threading.enumerate() if thread.name.endswith("-quiet_job")
+    ]
+    for thread in watch_threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in watch_threads)
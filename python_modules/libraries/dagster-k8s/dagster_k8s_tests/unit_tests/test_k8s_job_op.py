@@ -0,0 +1,383 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import kubernetes.client
+import pytest
+import urllib3
+import yaml
+from dagster import DagsterEventType, job, op
+from dagster._core.test_utils import instance_for_test
+from dagster_k8s import execute_k8s_job
+from dagster_k8s.client import DagsterK8sError, DagsterKubernetesClient, JobLifecyclePhase
+from dagster_k8s.ops.k8s_job_op import (
+    _PodLogForwarder,
+    _drain_pod_logs,
+    _get_api_client,
+    _load_kube_config,
+    reset_k8s_client_cache,
+)
+
+KUBECONFIG = {
+    "apiVersion": "v1",
+    "kind": "Config",
+    "current-context": "test",
+    "clusters": [{"name": "test", "cluster": {"server": "https://test-cluster:6443"}}],
+    "contexts": [{"name": "test", "context": {"cluster": "test", "user": "test"}}],
+    "users": [{"name": "test", "user": {"token": "test-token"}}],
+}
+
+
+def test_api_client_is_cached_per_config_source():
+    reset_k8s_client_cache()
+    with mock.patch("kubernetes.config.load_incluster_config") as load_incluster, mock.patch(
+        "dagster_k8s.ops.k8s_job_op._load_kube_config"
+    ) as load_kube_config, mock.patch.object(
+        DagsterKubernetesClient, "production_client", side_effect=lambda **_kwargs: mock.MagicMock()
+    ) as production_client:
+        incluster_client = _get_api_client(True, None)
+        assert _get_api_client(True, None) is incluster_client
+        assert load_incluster.call_count == 1
+
+        kubeconfig_client = _get_api_client(False, "/path/to/kubeconfig")
+        assert _get_api_client(False, "/path/to/kubeconfig") is kubeconfig_client
+        assert kubeconfig_client is not incluster_client
+        load_kube_config.assert_called_once_with("/path/to/kubeconfig", mock.ANY)
+
+        assert production_client.call_count == 2
+
+    reset_k8s_client_cache()
+
+
+@pytest.mark.parametrize("dump", [json.dumps, yaml.safe_dump])
+def test_load_kube_config(tmp_path, dump):
+    kubeconfig_file = os.path.join(str(tmp_path), "kubeconfig")
+    with open(kubeconfig_file, "w", encoding="utf8") as f:
+        f.write(dump(KUBECONFIG))
+
+    configuration = kubernetes.client.Configuration()
+    _load_kube_config(kubeconfig_file, configuration)
+    assert configuration.host == "https://test-cluster:6443"
+    assert configuration.api_key["authorization"] == "Bearer test-token"
+
+
+def _write_kubeconfig(kubeconfig_file, token):
+    kubeconfig = dict(KUBECONFIG, users=[{"name": "test", "user": {"token": token}}])
+    with open(kubeconfig_file, "w", encoding="utf8") as f:
+        f.write(yaml.safe_dump(kubeconfig))
+
+
+def test_api_client_reloads_rewritten_kubeconfig(tmp_path):
+    kubeconfig_file = os.path.join(str(tmp_path), "kubeconfig")
+    _write_kubeconfig(kubeconfig_file, "first-token")
+
+    reset_k8s_client_cache()
+    try:
+        api_client = _get_api_client(False, kubeconfig_file)
+        configuration = api_client.core_api.api_client.configuration
+        assert configuration.get_api_key_with_prefix("authorization") == "Bearer first-token"
+
+        # the kubeconfig is only loaded again once it changes
+        with mock.patch("dagster_k8s.ops.k8s_job_op._load_kube_config") as load_kube_config:
+            assert _get_api_client(False, kubeconfig_file) is api_client
+        assert not load_kube_config.called
+
+        # e.g. credentials that were rotated
+        _write_kubeconfig(kubeconfig_file, "second-token")
+        mtime = os.stat(kubeconfig_file).st_mtime
+        os.utime(kubeconfig_file, (mtime + 1, mtime + 1))
+
+        new_api_client = _get_api_client(False, kubeconfig_file)
+        assert new_api_client is not api_client
+        new_configuration = new_api_client.core_api.api_client.configuration
+        assert new_configuration.get_api_key_with_prefix("authorization") == "Bearer second-token"
+        # the configuration of the previous client, which may still be in use, is left as it was
+        assert configuration.get_api_key_with_prefix("authorization") == "Bearer first-token"
+    finally:
+        reset_k8s_client_cache()
+
+
+def _logged_messages(context):
+    return [args[0] for args, _ in context.log.info.call_args_list]
+
+
+def test_drain_pod_logs():
+    context = mock.MagicMock()
+    api_client = mock.MagicMock()
+    api_client.stream_pod_logs.return_value = (lines for lines in [["first", "second"], ["third"]])
+    log_forwarder = _PodLogForwarder(context)
+
+    _drain_pod_logs(context, api_client, "a_pod", "a_namespace", None, None, log_forwarder)
+
+    # the lines received in each chunk are forwarded together
+    assert _logged_messages(context) == ["first\nsecond", "third"]
+    api_client.stream_pod_logs.assert_called_once_with(
+        "a_pod",
+        "a_namespace",
+        container_name=None,
+        request_timeout=None,
+        stop_event=log_forwarder.stream_stop_event,
+    )
+
+
+def test_drain_pod_logs_splits_large_chunks():
+    context = mock.MagicMock()
+    api_client = mock.MagicMock()
+    api_client.stream_pod_logs.return_value = (lines for lines in [[str(i) for i in range(96)]])
+
+    _drain_pod_logs(
+        context, api_client, "a_pod", "a_namespace", None, None, _PodLogForwarder(context)
+    )
+
+    assert _logged_messages(context) == [
+        "\n".join(str(i) for i in range(64)),
+        "\n".join(str(i) for i in range(64, 96)),
+    ]
+
+
+def test_drain_pod_logs_forwards_lines_before_the_stream_goes_quiet():
+    context = mock.MagicMock()
+    forwarded = threading.Event()
+    context.log.info.side_effect = lambda _message: forwarded.set()
+
+    def _log_stream():
+        yield ["starting up"]
+        # the pod writes nothing more until its logs so far have been forwarded
+        assert forwarded.wait(5)
+        yield ["done"]
+
+    api_client = mock.MagicMock()
+    api_client.stream_pod_logs.return_value = _log_stream()
+
+    _drain_pod_logs(
+        context, api_client, "a_pod", "a_namespace", None, None, _PodLogForwarder(context)
+    )
+
+    assert _logged_messages(context) == ["starting up", "done"]
+
+
+def test_drain_pod_logs_stops():
+    context = mock.MagicMock()
+    log_forwarder = _PodLogForwarder(context)
+
+    def _log_stream():
+        yield [str(i) for i in range(64)]
+        log_forwarder.stop()
+        yield ["after stop"]
+        yield ["more after stop"]
+
+    api_client = mock.MagicMock()
+    api_client.stream_pod_logs.return_value = _log_stream()
+
+    _drain_pod_logs(context, api_client, "a_pod", "a_namespace", None, None, log_forwarder)
+
+    # nothing is logged once stopped
+    assert _logged_messages(context) == ["\n".join(str(i) for i in range(64))]
+
+
+def test_drain_pod_logs_with_prefix():
+    context = mock.MagicMock()
+    api_client = mock.MagicMock()
+    api_client.stream_pod_logs.return_value = (lines for lines in [["first", "second"]])
+
+    _drain_pod_logs(
+        context,
+        api_client,
+        "a_pod",
+        "a_namespace",
+        None,
+        None,
+        _PodLogForwarder(context),
+        log_prefix="a_pod: ",
+    )
+
+    assert _logged_messages(context) == ["a_pod: first\na_pod: second"]
+
+
+def test_drain_pod_logs_info_disabled():
+    context = mock.MagicMock()
+    context.log.isEnabledFor.return_value = False
+    api_client = mock.MagicMock()
+
+    _drain_pod_logs(
+        context, api_client, "a_pod", "a_namespace", None, None, _PodLogForwarder(context)
+    )
+
+    assert not api_client.stream_pod_logs.called
+
+
+def test_api_client_connection_pool():
+    reset_k8s_client_cache()
+    with mock.patch("kubernetes.config.load_incluster_config"):
+        api_client = _get_api_client(True, None)
+    reset_k8s_client_cache()
+
+    assert api_client.batch_api.api_client is api_client.core_api.api_client
+    configuration = api_client.core_api.api_client.configuration
+    assert configuration.connection_pool_maxsize >= 20
+    assert configuration.retries.total == 5
+    assert not configuration.retries.raise_on_status
+
+
+@contextmanager
+def _execute_k8s_job_with_mocked_client(api_client, timeout=None):
+    @op
+    def k8s_op(context):
+        execute_k8s_job(context, image="busybox", namespace="a_namespace", timeout=timeout)
+
+    @job
+    def k8s_job():
+        k8s_op()
+
+    with instance_for_test() as instance:
+        with mock.patch("dagster_k8s.ops.k8s_job_op._get_api_client", return_value=api_client):
+            result = k8s_job.execute_in_process(instance=instance, raise_on_error=False)
+        yield result, lambda: instance.all_logs(result.run_id)
+
+
+def _mock_api_client(lifecycle, log_stream_fn):
+    api_client = mock.MagicMock()
+    api_client.watch_job_lifecycle.return_value = lifecycle
+    api_client.stream_pod_logs.side_effect = lambda *_args, **_kwargs: log_stream_fn()
+    return api_client
+
+
+def _succeeding_lifecycle():
+    yield JobLifecyclePhase.PodReady, {"metadata": {"name": "a_pod"}}
+    yield JobLifecyclePhase.JobSucceeded, {"metadata": {"name": "a_job"}}
+
+
+def _step_messages(records):
+    """The user messages logged by the step, up to and including the step's final event."""
+    messages = []
+    for record in records:
+        if record.dagster_event and record.dagster_event.event_type in (
+            DagsterEventType.STEP_SUCCESS,
+            DagsterEventType.STEP_FAILURE,
+        ):
+            messages.append(record.dagster_event.event_type)
+        elif not record.dagster_event:
+            messages.append(record.user_message)
+    return messages
+
+
+def test_execute_k8s_job():
+    def _log_stream():
+        yield ["hello"]
+        yield ["world"]
+
+    api_client = _mock_api_client(_succeeding_lifecycle(), _log_stream)
+    with _execute_k8s_job_with_mocked_client(api_client) as (result, get_logs):
+        assert result.success
+        messages = _step_messages(get_logs())
+
+    assert messages.index("world") < messages.index(DagsterEventType.STEP_SUCCESS)
+    assert messages.index("hello") < messages.index("world")
+    api_client.batch_api.create_namespaced_job.assert_called_once()
+    api_client.stream_pod_logs.assert_called_once_with(
+        "a_pod", "a_namespace", container_name="dagster", request_timeout=None, stop_event=mock.ANY
+    )
+
+
+def test_execute_k8s_job_drains_logs_after_job_succeeds():
+    def _log_stream():
+        # the job's success is reported before the pod's last logs are read
+        time.sleep(0.5)
+        yield ["the end"]
+
+    api_client = _mock_api_client(_succeeding_lifecycle(), _log_stream)
+    with _execute_k8s_job_with_mocked_client(api_client, timeout=60) as (result, get_logs):
+        assert result.success
+        messages = _step_messages(get_logs())
+
+    assert messages.index("the end") < messages.index(DagsterEventType.STEP_SUCCESS)
+
+
+def test_execute_k8s_job_log_drain_times_out():
+    release_logs = threading.Event()
+    log_stream_closed = threading.Event()
+
+    def _log_stream():
+        try:
+            release_logs.wait(5)
+            yield ["too late"]
+        finally:
+            log_stream_closed.set()
+
+    api_client = _mock_api_client(_succeeding_lifecycle(), _log_stream)
+    with _execute_k8s_job_with_mocked_client(api_client, timeout=1) as (result, get_logs):
+        assert result.success
+        messages = _step_messages(get_logs())
+        assert any("the remaining logs of 1 pod(s) were not forwarded" in m for m in messages)
+
+        # logs read after the step has completed are not forwarded
+        release_logs.set()
+        assert log_stream_closed.wait(5)
+        assert "too late" not in _step_messages(get_logs())
+
+
+def test_execute_k8s_job_failure_stops_log_streams():
+    log_stream_closed = threading.Event()
+
+    def _failing_lifecycle():
+        yield JobLifecyclePhase.PodReady, {"metadata": {"name": "a_pod"}}
+        raise DagsterK8sError("Encountered failed job pods for job a_job")
+
+    def _log_stream():
+        try:
+            while True:
+                time.sleep(0.01)
+                yield []
+        finally:
+            log_stream_closed.set()
+
+    api_client = _mock_api_client(_failing_lifecycle(), _log_stream)
+    with _execute_k8s_job_with_mocked_client(api_client) as (result, get_logs):
+        assert not result.success
+        assert DagsterEventType.STEP_FAILURE in _step_messages(get_logs())
+
+    assert log_stream_closed.wait(5)
+
+
+def test_execute_k8s_job_failure_aborts_quiet_log_streams(quiet_stream_server):
+    pool = urllib3.PoolManager()
+    log_stream_opened = threading.Event()
+
+    def _failing_lifecycle():
+        yield JobLifecyclePhase.PodReady, {"metadata": {"name": "a_pod"}}
+        # The watch fails while the pod is still running, once its logs are being streamed
+        assert log_stream_opened.wait(5)
+        raise DagsterK8sError("Error while watching job a_job")
+
+    def _read_namespaced_pod_log(**_kwargs):
+        response = pool.request("GET", url, preload_content=False)
+        log_stream_opened.set()
+        return response
+
+    api_client = DagsterKubernetesClient(
+        batch_api=mock.MagicMock(),
+        core_api=mock.MagicMock(),
+        logger=mock.MagicMock(),
+        sleeper=mock.MagicMock(),
+        timer=time.time,
+    )
+    # No timeout is configured, so the log stream has no read timeout either
+    api_client.core_api.read_namespaced_pod_log.side_effect = _read_namespaced_pod_log
+    url = quiet_stream_server(b"hello\n")
+    with mock.patch.object(api_client, "watch_job_lifecycle", return_value=_failing_lifecycle()):
+        with _execute_k8s_job_with_mocked_client(api_client) as (result, _):
+            assert not result.success
+        assert log_stream_opened.is_set()
+
+        # The log thread was not left blocked on the stream, which would keep the process alive
+        log_threads = [
+            thread
+            for thread in threading.enumerate()
+            if thread.name.startswith("dagster-k8s-logs-")
+        ]
+        for thread in log_threads:
+            thread.join(5)
+        assert not any(thread.is_alive() for thread in log_threads)